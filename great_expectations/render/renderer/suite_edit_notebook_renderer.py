@@ -1,12 +1,20 @@
+import json
+import logging
 import os
-from typing import Dict, Optional, Union
+import pickle
+import re
+import sys
+import uuid
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple, Union
 
 import jinja2
-import nbformat
+import pkg_resources
 
 from great_expectations.core import ExpectationSuite
 from great_expectations.core.id_dict import BatchKwargs
 from great_expectations.data_context.types.base import (
+    NotebookConfig,
     NotebookTemplateConfig,
     notebookConfigSchema,
 )
@@ -17,6 +25,161 @@ from great_expectations.exceptions import (
 from great_expectations.render.renderer.renderer import Renderer
 from great_expectations.util import lint_code
 
+if TYPE_CHECKING:
+    # nbformat is imported where it is used to keep CLI startup fast
+    import nbformat
+
+logger = logging.getLogger(__name__)
+
+# A bytecode cache entry that cannot be read or written is treated as a miss
+_BYTECODE_CACHE_ERRORS = (OSError, EOFError, ValueError, pickle.UnpicklingError)
+
+JINJA_BYTECODE_CACHE_DIR = os.path.join(
+    os.path.expanduser("~/.great_expectations"), "cache", "jinja_bc"
+)
+NOTEBOOK_WRITE_BUFFER_SIZE = 1024 * 1024
+SUITE_EDIT_ASSETS_PACKAGE = "great_expectations.render.notebook_assets"
+BLACK_LINE_LENGTH = 88
+
+# Relative batch_kwargs paths are rewritten to be relative to the notebook dir
+_REL_PREFIX = os.path.join("..", "..")
+
+# Used by _is_lint_clean to tell black-formatted expectation code apart
+_DOUBLE_QUOTED_STRING_RE = re.compile(r'"[^"]*"')
+_LINT_CLEAN_CHARS_RE = re.compile(r"^[\w.,=()\[\]\" -]*$")
+_LINT_UNSAFE_RE = re.compile(
+    r"\b\d[\w.]*[A-Za-z_]"  # exponents, complex, hex and underscored numbers
+    r"|(?<!\w)\.|\.(?!\w)"  # floats like .5 or 5.
+    r"|(?<![=(\[])(?<!, )-|- "  # binary minus, spaced unary minus
+    r"|  | [,)\]=]|[(\[=] |,(?! )"  # spacing black would change
+)
+
+# Keys looked up once per expectation while building the notebook
+_COLUMN = sys.intern("column")
+_KWARGS = sys.intern("kwargs")
+_TABLE_EXPECTATIONS = sys.intern("table_expectations")
+
+# Default templates without any jinja markup, served without rendering
+_STATIC_TEMPLATE_NAMES = (
+    "AUTHORING_INTRO.md",
+    "COLUMN_EXPECTATIONS_HEADER.md",
+    "COLUMN_EXPECTATIONS_NOT_FOUND.md",
+    "FOOTER.md",
+    "TABLE_EXPECTATIONS_HEADER.md",
+    "TABLE_EXPECTATIONS_NOT_FOUND.md",
+)
+
+
+def _read_suite_edit_templates() -> Dict[str, str]:
+    """
+    Snapshot the packaged suite_edit templates as a {file_name: source} dict.
+    """
+    sources = {}
+    for file_name in sorted(
+        pkg_resources.resource_listdir(SUITE_EDIT_ASSETS_PACKAGE, "suite_edit")
+    ):
+        if not file_name.endswith((".md", ".j2")):
+            continue
+        sources[file_name] = pkg_resources.resource_string(
+            SUITE_EDIT_ASSETS_PACKAGE, "suite_edit/" + file_name
+        ).decode("utf-8")
+    return sources
+
+
+def _strip_trailing_newline(source: str) -> str:
+    # jinja drops a single trailing newline when rendering, so do the same here
+    if source.endswith("\n"):
+        return source[:-1]
+    return source
+
+
+# Filled from the packaged assets the first time a jinja environment is built
+_SUITE_EDIT_TEMPLATE_SOURCES: Dict[str, str] = {}
+_STATIC_TEMPLATES: Dict[str, str] = {}
+
+
+def _get_suite_edit_template_sources() -> Dict[str, str]:
+    if not _SUITE_EDIT_TEMPLATE_SOURCES:
+        sources = _read_suite_edit_templates()
+        _STATIC_TEMPLATES.update(
+            (file_name, _strip_trailing_newline(sources[file_name]))
+            for file_name in _STATIC_TEMPLATE_NAMES
+        )
+        _SUITE_EDIT_TEMPLATE_SOURCES.update(sources)
+    return _SUITE_EDIT_TEMPLATE_SOURCES
+
+
+@lru_cache(maxsize=32)
+def _load_suite_edit_notebook_config(config_json: str) -> NotebookConfig:
+    # Keyed by the serialized config, since the raw config holds nested dicts
+    return notebookConfigSchema.load(json.loads(config_json))
+
+
+@lru_cache(maxsize=1024)
+def _cached_lint(code: str) -> str:
+    return lint_code(code).rstrip("\n")
+
+
+def _is_lint_clean(code: str) -> bool:
+    """
+    Conservative check for rendered expectation code that black leaves as is.
+
+    Only a single short line made of double quoted strings (without escapes or
+    single quotes), names, plain decimal numbers, and "=", ",", "(", ")", "[",
+    "]" and unary minus in black's spacing is accepted. Anything else, such as
+    exponents (1e+20), complex numbers or binary operators, goes through black.
+    """
+    if len(code) > BLACK_LINE_LENGTH or "\n" in code or "'" in code or "\\" in code:
+        return False
+    code = _DOUBLE_QUOTED_STRING_RE.sub('""', code)
+    return bool(_LINT_CLEAN_CHARS_RE.match(code)) and not _LINT_UNSAFE_RE.search(code)
+
+
+def _render_column_expectation_code(expectation, kwargs_string, meta_args):
+    # Equivalent of the packaged column_expectation.py.j2
+    return f'batch.{expectation["expectation_type"]}({kwargs_string}{meta_args})'
+
+
+def _render_table_expectation_code(expectation, kwargs_string, meta_args):
+    # Equivalent of the packaged table_expectation.py.j2
+    return f'batch.{expectation["expectation_type"]}({kwargs_string})'
+
+
+# The packaged per-expectation templates are rendered once per expectation, so
+# they are specialized into plain python functions instead of going through
+# jinja. Tests check that both stay in sync with the .j2 files.
+_DEFAULT_EXPECTATION_CODE_RENDERERS: Dict[str, Callable[[Any, str, str], str]] = {
+    "column_expectation.py.j2": _render_column_expectation_code,
+    "table_expectation.py.j2": _render_table_expectation_code,
+}
+
+
+class _FailSafeBytecodeCache(jinja2.FileSystemBytecodeCache):
+    """
+    A FileSystemBytecodeCache that falls back to compiling templates when the
+    cache directory is unwritable or holds truncated entries (e.g. left behind
+    by concurrent CLI runs).
+    """
+
+    def load_bytecode(self, bucket):
+        try:
+            super().load_bytecode(bucket)
+        except _BYTECODE_CACHE_ERRORS as e:
+            logger.debug(
+                "Unable to load jinja bytecode cache entry {}: {}".format(bucket.key, e)
+            )
+            bucket.reset()
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except _BYTECODE_CACHE_ERRORS as e:
+            logger.debug(
+                "Unable to write jinja bytecode cache entry {}: {}".format(
+                    bucket.key, e
+                )
+            )
+
 
 class SuiteEditNotebookRenderer(Renderer):
     """
@@ -27,6 +190,9 @@ class SuiteEditNotebookRenderer(Renderer):
     - Make it easy to edit a suite where only JSON exists.
     """
 
+    # jinja environments shared across instances, keyed by custom_templates_module
+    _ENV_CACHE: Dict[Optional[str], jinja2.Environment] = {}
+
     def __init__(
         self,
         custom_templates_module: Optional[str] = None,
@@ -44,26 +210,9 @@ class SuiteEditNotebookRenderer(Renderer):
         table_expectation_code: Optional[NotebookTemplateConfig] = None,
     ):
         super().__init__()
-        custom_loader = []
-
-        if custom_templates_module:
-            try:
-                custom_loader = [
-                    jinja2.PackageLoader(*custom_templates_module.rsplit(".", 1))
-                ]
-            except ModuleNotFoundError as e:
-                raise SuiteEditNotebookCustomTemplateModuleNotFoundError(
-                    custom_templates_module
-                ) from e
-
-        loaders = custom_loader + [
-            jinja2.PackageLoader(
-                "great_expectations.render.notebook_assets", "suite_edit"
-            ),
-        ]
-        self.template_env = None
-
-        self.template_env = jinja2.Environment(loader=jinja2.ChoiceLoader(loaders))
+        self.custom_templates_module = custom_templates_module
+        self.template_env = self._get_env(custom_templates_module)
+        self._templates: Dict[str, jinja2.Template] = {}
 
         self.header_markdown = header_markdown
         self.footer_markdown = footer_markdown
@@ -83,12 +232,65 @@ class SuiteEditNotebookRenderer(Renderer):
         self.column_expectation_code = column_expectation_code
         self.table_expectation_code = table_expectation_code
 
+    @classmethod
+    def _get_env(cls, custom_templates_module: Optional[str]) -> jinja2.Environment:
+        """
+        Return the (memoized) jinja environment for the given templates module.
+        """
+        template_env = cls._ENV_CACHE.get(custom_templates_module)
+        if template_env is not None:
+            return template_env
+
+        # The packaged templates never change at runtime, so serve them from
+        # memory rather than looking them up in the package on every load
+        loader = jinja2.DictLoader(_get_suite_edit_template_sources())
+        if custom_templates_module:
+            try:
+                custom_loader = jinja2.PackageLoader(
+                    *custom_templates_module.rsplit(".", 1)
+                )
+            except ModuleNotFoundError as e:
+                raise SuiteEditNotebookCustomTemplateModuleNotFoundError(
+                    custom_templates_module
+                ) from e
+            loader = jinja2.ChoiceLoader([custom_loader, loader])
+
+        # Every template variable is supplied by this renderer, and templates are
+        # never edited while a process is rendering: skip the per lookup mtime
+        # checks and keep every compiled template for the life of the process.
+        template_env = jinja2.Environment(
+            loader=loader,
+            auto_reload=False,
+            cache_size=-1,
+            optimized=True,
+            undefined=jinja2.Undefined,
+            bytecode_cache=cls._get_bytecode_cache(),
+        )
+        cls._ENV_CACHE[custom_templates_module] = template_env
+        return template_env
+
+    @staticmethod
+    def _get_bytecode_cache() -> Optional[_FailSafeBytecodeCache]:
+        """
+        Persist compiled templates across processes (e.g. repeated CLI runs).
+        """
+        try:
+            os.makedirs(JINJA_BYTECODE_CACHE_DIR, exist_ok=True)
+        except OSError as e:
+            logger.debug(
+                "Unable to create jinja bytecode cache directory {}: {}".format(
+                    JINJA_BYTECODE_CACHE_DIR, e
+                )
+            )
+            return None
+        return _FailSafeBytecodeCache(directory=JINJA_BYTECODE_CACHE_DIR)
+
     @staticmethod
     def from_data_context(data_context):
         suite_edit_notebook_config: Optional[NotebookConfig] = None
         if data_context.notebooks and data_context.notebooks.get("suite_edit"):
-            suite_edit_notebook_config = notebookConfigSchema.load(
-                data_context.notebooks.get("suite_edit")
+            suite_edit_notebook_config = _load_suite_edit_notebook_config(
+                json.dumps(data_context.notebooks.get("suite_edit"), sort_keys=True)
             )
 
         return instantiate_class_from_config(
@@ -105,51 +307,102 @@ class SuiteEditNotebookRenderer(Renderer):
     @classmethod
     def _get_expectations_by_column(cls, expectations):
         # TODO probably replace this with Suite logic at some point
-        expectations_by_column = {"table_expectations": []}
+        expectations_by_column = {_TABLE_EXPECTATIONS: []}
         for exp in expectations:
-            if "column" in exp["kwargs"]:
-                col = exp["kwargs"]["column"]
-
-                if col not in expectations_by_column.keys():
-                    expectations_by_column[col] = []
-                expectations_by_column[col].append(exp)
+            kwargs = exp[_KWARGS]
+            if _COLUMN in kwargs:
+                expectations_by_column.setdefault(kwargs[_COLUMN], []).append(exp)
             else:
-                expectations_by_column["table_expectations"].append(exp)
+                expectations_by_column[_TABLE_EXPECTATIONS].append(exp)
 
         return expectations_by_column
 
     @classmethod
     def _build_kwargs_string(cls, expectation):
+        column = []
         kwargs = []
-        for k, v in expectation["kwargs"].items():
-            if k == "column":
-                # make the column a positional argument
-                kwargs.insert(0, "{}='{}'".format(k, v))
-
+        for k, v in expectation[_KWARGS].items():
+            if k == _COLUMN:
+                # make the column the first argument
+                column.append(f"{k}={cls._quote_string(v)}")
             elif isinstance(v, str):
                 # Put strings in quotes
-                kwargs.append("{}='{}'".format(k, v))
+                kwargs.append(f"{k}={cls._quote_string(v)}")
             else:
                 # Pass other types as is
-                kwargs.append("{}={}".format(k, v))
+                kwargs.append(f"{k}={v}")
+
+        return ", ".join(column + kwargs)
+
+    @staticmethod
+    def _quote_string(value) -> str:
+        # Prefer double quotes, as black does, unless the value contains them
+        value = str(value)
+        if '"' in value and "'" not in value:
+            return f"'{value}'"
+        return f'"{value}"'
+
+    def _get_template(self, file_name: str) -> jinja2.Template:
+        template = self._templates.get(file_name)
+        if template is None:
+            template = self.template_env.get_template(file_name)
+            self._templates[file_name] = template
+        return template
+
+    def _uses_default_template(
+        self, notebook_config: Optional[NotebookTemplateConfig]
+    ) -> bool:
+        """
+        Whether the packaged template, rather than a custom one, will be used.
+        """
+        return not notebook_config and not self.custom_templates_module
 
-        return ", ".join(kwargs)
+    def _resolve_template(
+        self, notebook_config: Optional[NotebookTemplateConfig], default_file_name: str
+    ) -> Tuple[jinja2.Template, dict]:
+        """
+        Return the template to render and the extra kwargs configured for it.
+        """
+        if notebook_config:
+            return (
+                self._get_template(notebook_config.file_name),
+                notebook_config.template_kwargs,
+            )
+        return self._get_template(default_file_name), {}
 
     def render_with_overwrite(
         self,
         notebook_config: Optional[NotebookTemplateConfig],
         default_file_name: str,
-        **default_kwargs
+        **default_kwargs,
     ):
-        if notebook_config:
-            rendered = self.template_env.get_template(notebook_config.file_name).render(
-                **default_kwargs, **notebook_config.template_kwargs
-            )
-        else:
-            rendered = self.template_env.get_template(default_file_name).render(
-                **default_kwargs
+        if (
+            self._uses_default_template(notebook_config)
+            and not default_kwargs
+            and default_file_name in _STATIC_TEMPLATES
+        ):
+            return _STATIC_TEMPLATES[default_file_name]
+
+        template, template_kwargs = self._resolve_template(
+            notebook_config, default_file_name
+        )
+        return template.render(**default_kwargs, **template_kwargs)
+
+    @staticmethod
+    def _render_template(template: jinja2.Template, template_vars: dict) -> str:
+        """
+        Render a template from a prebuilt dict of variables.
+
+        This skips the argument packing done by Template.render, which adds up
+        when the same template is rendered once per expectation. The dict is
+        copied into the new context so callers may reuse and mutate it.
+        """
+        try:
+            return "".join(
+                template.root_render_func(template.new_context(template_vars))
             )
-        return rendered
+        except Exception:
+            return template.environment.handle_exception()
 
     def add_header(self, suite_name: str, batch_kwargs) -> None:
         markdown = self.render_with_overwrite(
@@ -180,18 +433,38 @@ class SuiteEditNotebookRenderer(Renderer):
         """
         Add the given code as a new code cell.
         """
-        if lint:
-            code = lint_code(code).rstrip("\n")
-
-        cell = nbformat.v4.new_code_cell(code)
-        self._notebook["cells"].append(cell)
+        self._cells.append(self._new_code_cell(code, lint=lint))
 
     def add_markdown_cell(self, markdown: str) -> None:
         """
         Add the given markdown as a new markdown cell.
         """
-        cell = nbformat.v4.new_markdown_cell(markdown)
-        self._notebook["cells"].append(cell)
+        self._cells.append(self._new_markdown_cell(markdown))
+
+    # Cells are built directly rather than with nbformat.v4.new_*_cell, which
+    # validates every cell against the schema. They must therefore match the
+    # cell shape of the nbformat minor version the notebook is created with.
+    @staticmethod
+    def _new_cell(cell_type: str, source: str, **fields) -> "nbformat.NotebookNode":
+        from nbformat import NotebookNode, v4
+
+        cell = NotebookNode(
+            cell_type=cell_type, metadata=NotebookNode(), source=source, **fields
+        )
+        if v4.nbformat_minor >= 5:
+            # nbformat 4.5 requires a unique id on every cell
+            cell.id = uuid.uuid4().hex[:8]
+        return cell
+
+    @classmethod
+    def _new_code_cell(cls, code: str, lint: bool = False) -> "nbformat.NotebookNode":
+        if lint:
+            code = _cached_lint(code)
+        return cls._new_cell("code", code, execution_count=None, outputs=[])
+
+    @classmethod
+    def _new_markdown_cell(cls, markdown: str) -> "nbformat.NotebookNode":
+        return cls._new_cell("markdown", markdown)
 
     def add_expectation_cells_from_suite(self, expectations):
         expectations_by_column = self._get_expectations_by_column(expectations)
@@ -201,7 +474,7 @@ class SuiteEditNotebookRenderer(Renderer):
         self.add_markdown_cell(markdown)
         self._add_table_level_expectations(expectations_by_column)
         # Remove the table expectations since they are dealt with
-        expectations_by_column.pop("table_expectations")
+        expectations_by_column.pop(_TABLE_EXPECTATIONS)
         markdown = self.render_with_overwrite(
             self.column_expectations_header_markdown, "COLUMN_EXPECTATIONS_HEADER.md"
         )
@@ -217,6 +490,16 @@ class SuiteEditNotebookRenderer(Renderer):
             self.add_markdown_cell(markdown)
             return
 
+        default_template = self._uses_default_template(self.column_expectation_code)
+        render_code = self._get_expectation_code_renderer(
+            self.column_expectation_code, "column_expectation.py.j2"
+        )
+        # Bind the per expectation helpers to locals for the loop below
+        build_kwargs_string = self._build_kwargs_string
+        build_meta_arguments = self._build_meta_arguments
+        add_code_cell = self.add_code_cell
+        # Columns are rendered one after another: lint_code runs black in-process,
+        # which holds the GIL, so a thread pool would not make this faster
         for column, expectations in expectations_by_column.items():
             markdown = self.render_with_overwrite(
                 self.column_expectations_markdown,
@@ -226,19 +509,14 @@ class SuiteEditNotebookRenderer(Renderer):
             self.add_markdown_cell(markdown)
 
             for exp in expectations:
-                code = self.render_with_overwrite(
-                    self.column_expectation_code,
-                    "column_expectation.py.j2",
-                    expectation=exp,
-                    kwargs_string=self._build_kwargs_string(exp),
-                    meta_args=self._build_meta_arguments(exp.meta),
-                )
-                self.add_code_cell(
-                    code, lint=True,
+                code = render_code(
+                    exp, build_kwargs_string(exp), build_meta_arguments(exp.meta)
                 )
+                lint = not (default_template and _is_lint_clean(code))
+                add_code_cell(code, lint=lint)
 
     def _add_table_level_expectations(self, expectations_by_column):
-        if not expectations_by_column["table_expectations"]:
+        if not expectations_by_column[_TABLE_EXPECTATIONS]:
             markdown = self.render_with_overwrite(
                 self.table_expectations_not_found_markdown,
                 "TABLE_EXPECTATIONS_NOT_FOUND.md",
@@ -246,15 +524,44 @@ class SuiteEditNotebookRenderer(Renderer):
             self.add_markdown_cell(markdown)
             return
 
-        for exp in expectations_by_column["table_expectations"]:
-            code = self.render_with_overwrite(
-                self.table_expectation_code,
-                "table_expectation.py.j2",
-                expectation=exp,
-                kwargs_string=self._build_kwargs_string(exp),
-                meta_args=self._build_meta_arguments(exp.meta),
+        default_template = self._uses_default_template(self.table_expectation_code)
+        render_code = self._get_expectation_code_renderer(
+            self.table_expectation_code, "table_expectation.py.j2"
+        )
+        # Bind the per expectation helpers to locals for the loop below
+        build_kwargs_string = self._build_kwargs_string
+        build_meta_arguments = self._build_meta_arguments
+        add_code_cell = self.add_code_cell
+        for exp in expectations_by_column[_TABLE_EXPECTATIONS]:
+            code = render_code(
+                exp, build_kwargs_string(exp), build_meta_arguments(exp.meta)
             )
-            self.add_code_cell(code, lint=True)
+            lint = not (default_template and _is_lint_clean(code))
+            add_code_cell(code, lint=lint)
+
+    def _get_expectation_code_renderer(
+        self, notebook_config: Optional[NotebookTemplateConfig], default_file_name: str
+    ) -> Callable[[Any, str, str], str]:
+        """
+        Return a function rendering the code of a single expectation.
+
+        Custom templates are rendered by jinja from a reused dict of variables.
+        """
+        if self._uses_default_template(notebook_config):
+            return _DEFAULT_EXPECTATION_CODE_RENDERERS[default_file_name]
+
+        template, template_kwargs = self._resolve_template(
+            notebook_config, default_file_name
+        )
+        template_vars = dict(template_kwargs)
+
+        def render_code(expectation, kwargs_string, meta_args):
+            template_vars["expectation"] = expectation
+            template_vars["kwargs_string"] = kwargs_string
+            template_vars["meta_args"] = meta_args
+            return self._render_template(template, template_vars)
+
+        return render_code
 
     @staticmethod
     def _build_meta_arguments(meta):
@@ -262,29 +569,40 @@ class SuiteEditNotebookRenderer(Renderer):
             return ""
 
         profiler = "BasicSuiteBuilderProfiler"
-        if profiler in meta.keys():
-            meta.pop(profiler)
+        if profiler in meta:
+            # Leave the expectation's own meta untouched
+            meta = {k: v for k, v in meta.items() if k != profiler}
 
-        if meta.keys():
-            return ", meta={}".format(meta)
+        if meta:
+            return f", meta={meta}"
 
         return ""
 
     @classmethod
     def write_notebook_to_disk(cls, notebook, notebook_file_path):
-        with open(notebook_file_path, "w") as f:
-            nbformat.write(notebook, f)
+        # Serialize up front so the notebook is written in a single call
+        import nbformat
+
+        contents = nbformat.writes(notebook)
+        if not contents.endswith("\n"):
+            contents += "\n"
+        with open(notebook_file_path, "w", buffering=NOTEBOOK_WRITE_BUFFER_SIZE) as f:
+            f.write(contents)
 
     def render(
         self, suite: ExpectationSuite, batch_kwargs=None
-    ) -> nbformat.NotebookNode:
+    ) -> "nbformat.NotebookNode":
         """
         Render a notebook dict from an expectation suite.
         """
         if not isinstance(suite, ExpectationSuite):
             raise RuntimeWarning("render must be given an ExpectationSuite.")
 
+        import nbformat
+
         self._notebook = nbformat.v4.new_notebook()
+        # cells are collected here and attached to the notebook once rendered
+        self._cells = []
 
         suite_name = suite.expectation_suite_name
 
@@ -294,6 +612,7 @@ class SuiteEditNotebookRenderer(Renderer):
         self.add_expectation_cells_from_suite(suite.expectations)
         self.add_footer()
 
+        self._notebook["cells"] = self._cells
         return self._notebook
 
     def render_to_disk(
@@ -339,6 +658,6 @@ class SuiteEditNotebookRenderer(Renderer):
         if batch_kwargs and "path" in batch_kwargs.keys():
             base_dir = batch_kwargs["path"]
             if not os.path.isabs(base_dir):
-                batch_kwargs["path"] = os.path.join("..", "..", base_dir)
+                batch_kwargs["path"] = os.path.join(_REL_PREFIX, base_dir)
 
         return batch_kwargs
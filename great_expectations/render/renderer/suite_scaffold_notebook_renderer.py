@@ -1,4 +1,4 @@
-import nbformat
+from typing import TYPE_CHECKING
 
 from great_expectations import DataContext
 from great_expectations.core import ExpectationSuite
@@ -7,6 +7,9 @@ from great_expectations.render.renderer.suite_edit_notebook_renderer import (
     SuiteEditNotebookRenderer,
 )
 
+if TYPE_CHECKING:
+    import nbformat
+
 
 class SuiteScaffoldNotebookRenderer(SuiteEditNotebookRenderer):
     def __init__(self, context: DataContext, suite: ExpectationSuite, batch_kwargs):
@@ -92,8 +95,11 @@ This can be done by running `great_expectations suite edit {self.suite_name}`.""
         ), "Batch failed to load. Please check your batch_kwargs"
         return batch
 
-    def render(self, batch_kwargs=None, **kwargs) -> nbformat.NotebookNode:
+    def render(self, batch_kwargs=None, **kwargs) -> "nbformat.NotebookNode":
+        import nbformat
+
         self._notebook = nbformat.v4.new_notebook()
+        self._cells = []
         self.add_header()
         self.add_markdown_cell(
             """## Select the columns on which you would like to scaffold expectations
@@ -122,6 +128,7 @@ contains a list of possible expectations."""
         )
         self._add_scaffold_cell()
         self.add_footer()
+        self._notebook["cells"] = self._cells
         return self._notebook
 
     def render_to_disk(self, notebook_file_path: str) -> None:
@@ -149,6 +149,21 @@ def no_usage_stats(monkeypatch):
     monkeypatch.setenv("GE_USAGE_STATS", "False")
 
 
+@pytest.fixture(autouse=True)
+def no_user_jinja_bytecode_cache(monkeypatch, tmp_path_factory):
+    # Keep compiled notebook templates out of the user's home directory
+    from great_expectations.render.renderer import suite_edit_notebook_renderer
+
+    monkeypatch.setattr(
+        suite_edit_notebook_renderer,
+        "JINJA_BYTECODE_CACHE_DIR",
+        os.path.join(str(tmp_path_factory.getbasetemp()), "jinja_bc"),
+    )
+    monkeypatch.setattr(
+        suite_edit_notebook_renderer.SuiteEditNotebookRenderer, "_ENV_CACHE", {}
+    )
+
+
 @pytest.fixture
 def sa(test_backends):
     if (
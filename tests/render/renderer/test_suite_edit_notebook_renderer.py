@@ -1,19 +1,25 @@
 import json
 import os
+import re
+import subprocess
+import sys
 
+import jinja2
 import nbformat
 import pytest
 from nbconvert.preprocessors import ExecutePreprocessor
 
 from great_expectations import DataContext
 from great_expectations.cli.suite import _suite_edit
-from great_expectations.core import ExpectationSuiteSchema
+from great_expectations.core import ExpectationConfiguration, ExpectationSuiteSchema
 from great_expectations.exceptions import (
     SuiteEditNotebookCustomTemplateModuleNotFoundError,
 )
+from great_expectations.render.renderer import suite_edit_notebook_renderer
 from great_expectations.render.renderer.suite_edit_notebook_renderer import (
     SuiteEditNotebookRenderer,
 )
+from great_expectations.util import lint_code
 
 
 @pytest.fixture
@@ -1461,3 +1467,284 @@ def test_notebook_execution_with_custom_notebooks(
     for obs_cell, expected_cell in zip(obs["cells"], expected["cells"]):
         assert obs_cell == expected_cell
     assert obs == expected
+
+
+def test_template_env_is_shared_across_instances():
+    first = SuiteEditNotebookRenderer()
+    second = SuiteEditNotebookRenderer()
+    assert first.template_env is second.template_env
+    assert first.template_env.auto_reload is False
+    assert first.template_env.optimized is True
+    assert first.template_env.undefined is jinja2.Undefined
+
+
+def test_compiled_templates_are_written_to_bytecode_cache(
+    monkeypatch, tmp_path_factory, critical_suite_with_citations
+):
+    cache_dir = os.path.join(str(tmp_path_factory.mktemp("cache")), "jinja_bc")
+    monkeypatch.setattr(
+        suite_edit_notebook_renderer, "JINJA_BYTECODE_CACHE_DIR", cache_dir
+    )
+
+    SuiteEditNotebookRenderer().render(critical_suite_with_citations)
+    assert os.path.isdir(cache_dir)
+    assert any(name.endswith(".cache") for name in os.listdir(cache_dir))
+
+
+def test_unwritable_bytecode_cache_dir_does_not_break_render(
+    monkeypatch, tmp_path_factory, critical_suite_with_citations
+):
+    cache_dir = os.path.join(str(tmp_path_factory.mktemp("cache")), "jinja_bc")
+    os.makedirs(cache_dir)
+    os.chmod(cache_dir, 0o500)
+    try:
+        if os.access(cache_dir, os.W_OK):
+            pytest.skip("cache dir is still writable (running as root?)")
+        monkeypatch.setattr(
+            suite_edit_notebook_renderer, "JINJA_BYTECODE_CACHE_DIR", cache_dir
+        )
+
+        notebook = SuiteEditNotebookRenderer().render(critical_suite_with_citations)
+        assert notebook["cells"]
+        assert os.listdir(cache_dir) == []
+    finally:
+        os.chmod(cache_dir, 0o700)
+
+
+def test_truncated_bytecode_cache_entries_are_recompiled(
+    monkeypatch, tmp_path_factory, critical_suite_with_citations
+):
+    cache_dir = os.path.join(str(tmp_path_factory.mktemp("cache")), "jinja_bc")
+    monkeypatch.setattr(
+        suite_edit_notebook_renderer, "JINJA_BYTECODE_CACHE_DIR", cache_dir
+    )
+    expected = SuiteEditNotebookRenderer().render(critical_suite_with_citations)
+
+    # Keep the header so the entry is unpickled and hits the end of the file
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        with open(path, "rb") as f:
+            head = f.read(len(jinja2.bccache.bc_magic) + 1)
+        with open(path, "wb") as f:
+            f.write(head)
+    monkeypatch.setattr(SuiteEditNotebookRenderer, "_ENV_CACHE", {})
+
+    notebook = SuiteEditNotebookRenderer().render(critical_suite_with_citations)
+    assert [cell["source"] for cell in notebook["cells"]] == [
+        cell["source"] for cell in expected["cells"]
+    ]
+
+
+def test_add_code_cell_reuses_linted_code():
+    renderer = SuiteEditNotebookRenderer()
+    renderer._cells = []
+    code = "batch.expect_column_to_exist(column='repeated_lint_column')"
+
+    renderer.add_code_cell(code, lint=True)
+    hits = suite_edit_notebook_renderer._cached_lint.cache_info().hits
+    renderer.add_code_cell(code, lint=True)
+
+    assert suite_edit_notebook_renderer._cached_lint.cache_info().hits == hits + 1
+    assert [cell["source"] for cell in renderer._cells] == [
+        'batch.expect_column_to_exist(column="repeated_lint_column")'
+    ] * 2
+
+
+def test_build_kwargs_string_puts_column_first_and_quotes_strings():
+    expectation = {
+        "kwargs": {"min_value": 0, "column": "age", "mostly": 0.95, "type_": "int"}
+    }
+    assert (
+        SuiteEditNotebookRenderer._build_kwargs_string(expectation)
+        == 'column="age", min_value=0, mostly=0.95, type_="int"'
+    )
+
+
+def test_column_cells_go_through_add_cell_hooks(critical_suite_with_citations):
+    class RecordingRenderer(SuiteEditNotebookRenderer):
+        def __init__(self):
+            super().__init__()
+            self.recorded = []
+
+        def add_code_cell(self, code, lint=False, **template_params):
+            self.recorded.append(("code", code))
+            super().add_code_cell(code, lint=lint, **template_params)
+
+        def add_markdown_cell(self, markdown):
+            self.recorded.append(("markdown", markdown))
+            super().add_markdown_cell(markdown)
+
+    renderer = RecordingRenderer()
+    obs = renderer.render(critical_suite_with_citations)
+
+    assert len(renderer.recorded) == len(obs["cells"])
+    assert ("markdown", "#### `npi`") in renderer.recorded
+
+
+@pytest.mark.parametrize(
+    "file_name", suite_edit_notebook_renderer._STATIC_TEMPLATE_NAMES
+)
+def test_static_templates_match_jinja_rendering(file_name):
+    renderer = SuiteEditNotebookRenderer()
+    assert (
+        renderer.render_with_overwrite(None, file_name)
+        == renderer.template_env.get_template(file_name).render()
+    )
+
+
+def test_from_data_context_reuses_loaded_notebook_config(
+    data_context_custom_notebooks,
+):
+    load_config = suite_edit_notebook_renderer._load_suite_edit_notebook_config
+    first = SuiteEditNotebookRenderer.from_data_context(data_context_custom_notebooks)
+    hits = load_config.cache_info().hits
+    second = SuiteEditNotebookRenderer.from_data_context(data_context_custom_notebooks)
+
+    assert load_config.cache_info().hits == hits + 1
+    assert first is not second
+    assert second.custom_templates_module == "notebook_assets.suite_edit"
+    assert second.header_markdown.template_kwargs == {"company_name": "MyCompany"}
+
+
+def test_build_meta_arguments_drops_profiler_without_mutating_meta():
+    meta = {"question": True, "BasicSuiteBuilderProfiler": {"confidence": "low"}}
+    assert (
+        SuiteEditNotebookRenderer._build_meta_arguments(meta)
+        == ", meta={'question': True}"
+    )
+    assert "BasicSuiteBuilderProfiler" in meta
+    assert (
+        SuiteEditNotebookRenderer._build_meta_arguments(
+            {"BasicSuiteBuilderProfiler": {}}
+        )
+        == ""
+    )
+
+
+def test_lint_clean_expectation_code_skips_black():
+    renderer = SuiteEditNotebookRenderer()
+    renderer._cells = []
+    expectation = ExpectationConfiguration(
+        expectation_type="expect_column_values_to_not_be_null",
+        kwargs={"column": "lint_clean_column"},
+    )
+    lint_calls = suite_edit_notebook_renderer._cached_lint.cache_info()
+    renderer._add_column_level_expectations({"lint_clean_column": [expectation]})
+
+    assert suite_edit_notebook_renderer._cached_lint.cache_info() == lint_calls
+    assert (
+        renderer._cells[1]["source"]
+        == 'batch.expect_column_values_to_not_be_null(column="lint_clean_column")'
+    )
+
+
+@pytest.mark.parametrize(
+    "value",
+    [1e20, 1.5e16, 1e-05, 0.5, -3, 123.0, 1 + 2j, -1j, (1,), [1.5, -2], float("inf")],
+)
+def test_skipping_black_matches_lint_code(value):
+    # Complex kwargs can't go through ExpectationConfiguration, so render the
+    # packaged template directly and check the skip path against lint_code.
+    expectation = {
+        "expectation_type": "expect_column_values_to_be_between",
+        "kwargs": {"column": "c", "max_value": value},
+    }
+    code = (
+        SuiteEditNotebookRenderer()
+        .template_env.get_template("column_expectation.py.j2")
+        .render(
+            expectation=expectation,
+            kwargs_string=SuiteEditNotebookRenderer._build_kwargs_string(expectation),
+            meta_args="",
+        )
+    )
+    linted = lint_code(code).rstrip("\n")
+    if suite_edit_notebook_renderer._is_lint_clean(code):
+        assert code == linted
+    else:
+        assert suite_edit_notebook_renderer._cached_lint(code) == linted
+
+
+def test_templates_are_read_on_first_environment_build(tmp_path):
+    code = (
+        "from great_expectations.render.renderer import suite_edit_notebook_renderer as r\n"
+        "assert not r._SUITE_EDIT_TEMPLATE_SOURCES and not r._STATIC_TEMPLATES\n"
+        "r.SuiteEditNotebookRenderer._get_env(None)\n"
+        "assert 'FOOTER.md' in r._SUITE_EDIT_TEMPLATE_SOURCES\n"
+        "assert sorted(r._STATIC_TEMPLATES) == sorted(r._STATIC_TEMPLATE_NAMES)"
+    )
+    # Keep the jinja bytecode cache out of the user's home directory
+    env = {**os.environ, "HOME": str(tmp_path)}
+    subprocess.run([sys.executable, "-c", code], check=True, env=env)
+
+
+def test_importing_renderer_does_not_import_nbformat():
+    code = (
+        "import sys\n"
+        "import great_expectations.render.renderer.suite_edit_notebook_renderer\n"
+        "assert 'nbformat' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def _without_id(cell):
+    return {key: value for key, value in cell.items() if key != "id"}
+
+
+def test_cells_match_nbformat_cells_and_do_not_share_state():
+    code_cell = SuiteEditNotebookRenderer._new_code_cell("batch.head()")
+    markdown_cell = SuiteEditNotebookRenderer._new_markdown_cell("# Title")
+    assert _without_id(code_cell) == _without_id(
+        nbformat.v4.new_code_cell("batch.head()")
+    )
+    assert _without_id(markdown_cell) == _without_id(
+        nbformat.v4.new_markdown_cell("# Title")
+    )
+    assert ("id" in code_cell) == (nbformat.v4.nbformat_minor >= 5)
+    assert code_cell.source == "batch.head()"
+
+    other_cell = SuiteEditNotebookRenderer._new_code_cell("batch.head()")
+    other_cell.outputs.append({"output_type": "stream"})
+    assert code_cell.outputs == []
+
+
+def test_rendered_notebook_is_valid(critical_suite_with_citations, empty_data_context):
+    notebook = SuiteEditNotebookRenderer.from_data_context(empty_data_context).render(
+        critical_suite_with_citations
+    )
+    nbformat.validate(notebook)
+
+
+def test_cells_get_unique_ids_from_nbformat_4_5(monkeypatch):
+    monkeypatch.setattr(nbformat.v4, "nbformat_minor", 5)
+    cells = [
+        SuiteEditNotebookRenderer._new_code_cell("batch.head()"),
+        SuiteEditNotebookRenderer._new_markdown_cell("# Title"),
+        SuiteEditNotebookRenderer._new_code_cell("batch.head()"),
+    ]
+    ids = [cell.id for cell in cells]
+    assert len(set(ids)) == len(ids)
+    assert all(re.match(r"^[a-zA-Z0-9-_]{1,64}$", cell_id) for cell_id in ids)
+
+
+@pytest.mark.parametrize(
+    "file_name",
+    sorted(suite_edit_notebook_renderer._DEFAULT_EXPECTATION_CODE_RENDERERS.keys()),
+)
+def test_default_expectation_code_renderers_match_templates(file_name):
+    renderer = SuiteEditNotebookRenderer()
+    expectation = ExpectationConfiguration(
+        expectation_type="expect_column_values_to_be_between",
+        kwargs={"column": "age", "min_value": 0},
+    )
+    template_vars = {
+        "expectation": expectation,
+        "kwargs_string": 'column="age", min_value=0',
+        "meta_args": ", meta={'notes': 'check'}",
+    }
+    render_code = suite_edit_notebook_renderer._DEFAULT_EXPECTATION_CODE_RENDERERS[
+        file_name
+    ]
+    assert render_code(**template_vars) == renderer.template_env.get_template(
+        file_name
+    ).render(**template_vars)